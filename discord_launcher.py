@@ -1,99 +1,231 @@
-import argparse, discord_launcher_lib, multiprocessing, logging, tomllib
-from multiprocessing import freeze_support
+import argparse, collections.abc, functools, logging, os, sys
 from pathlib import Path
+from typing import Callable
 
 APP_NAME: str = "discord_launcher"
-CONFIG_DIR: Path = Path.home().joinpath(".local/share").joinpath(APP_NAME)
-CONFIG_FILE: Path = CONFIG_DIR.joinpath("config.toml")
+_CONFIG_DIR: Path | None = None
+# Directories already created (or found to exist) by this process.
+_ensured_dirs: set[str] = set()
 
-def initialize_config(path: Path, launcher_path = Path(__file__).parent.resolve().joinpath("discord_launcher.py")):
+def config_dir() -> Path:
+	"""
+	Return this launcher's data directory.
+
+	This is computed on first use so that invocations which never touch the config don't look up the home directory.
+	"""
+	global _CONFIG_DIR
+	if _CONFIG_DIR is None:
+		_CONFIG_DIR = Path.home().joinpath(".local/share", APP_NAME)
+	return _CONFIG_DIR
+
+def initialize_config(path: Path, launcher_path: Path | None = None):
 	"""
 	Initialize this launcher's config.
 
-	`launcher_path` can be set to the path of the launcher that should appear in the desktop file.
+	`launcher_path` can be set to the path of the launcher that should appear in the desktop file. Default is this script.
 	"""
+	import discord_launcher_lib
+	if launcher_path is None:
+		script_dir: Path = Path(__file__).parent
+		if script_dir.is_file():
+			# Running from a zipapp, where this script is inside the archive, so the archive itself is the launcher
+			launcher_path = script_dir.absolute()
+		else:
+			launcher_path = script_dir.joinpath("discord_launcher.py")
+	# This only ends up in the config text, so a plain string is enough.
+	discord_path: str = os.path.join(config_dir(), "Discord")
 	logging.info("Initializing config at {}".format(path))
-	path.parent.mkdir(parents = True, exist_ok = True)
-	path.write_text("discord_path = \"{}\"\nworking_directory = \"/usr/bin\"\nlaunch_args = []\nlauncher_path = \"{}\"\nrelease_channel = \"stable\"\n\n[desktop_entry]\nenabled = true\npath = \"{}\"\ntryexec = true\nsetup_action = false\n".format(CONFIG_DIR.joinpath("Discord"), launcher_path, Path.home().joinpath(".local/share/applications/{}.desktop".format(discord_launcher_lib.SERVICE_NAME))))
+	parent: str = str(path.parent)
+	if parent not in _ensured_dirs:
+		try:
+			path.parent.mkdir(parents = True)
+		except FileExistsError:
+			pass
+		_ensured_dirs.add(parent)
+	lines: tuple[str, ...] = (
+		f'discord_path = "{discord_path}"',
+		'working_directory = "/usr/bin"',
+		'launch_args = []',
+		f'launcher_path = "{launcher_path}"',
+		'release_channel = "stable"',
+		'',
+		'[desktop_entry]',
+		'enabled = true',
+		f'path = "{discord_launcher_lib.DEFAULT_DESKTOP_PATH}"',
+		'tryexec = true',
+		'setup_action = false',
+		'',
+	)
+	path.write_bytes("\n".join(lines).encode("utf-8"))
 
-def verify_config_exists(config_path: Path):
+def read_config(config_path: Path) -> dict:
 	"""
-	Make sure the config file exists.
+	Read the config at path and return a dict.
+
+	If the config file doesn't exist yet, it is initialized first.
+
+	The parsed config is cached per resolved path, so repeated reads in the same process are free.
 	"""
-	if not config_path.is_file():
-		initialize_config(config_path)
-	else:
+	return _read_config(str(config_path.resolve()))
+
+@functools.lru_cache(maxsize = 4)
+def _read_config(config_path: str) -> dict:
+	import tomllib
+	try:
+		file = open(config_path, "rb")
 		logging.debug("Config found at \"{}\"".format(config_path))
+	except FileNotFoundError:
+		initialize_config(Path(config_path))
+		file = open(config_path, "rb")
+	with file:
+		return tomllib.load(file)
 
-def read_config(config_path: Path) -> dict:
+def _config_path(args: argparse.Namespace) -> Path:
 	"""
-	Read the config at path and return a dict.
+	Return the config path given in `args`, or the default config path if none was given.
+	"""
+	return getattr(args, "config", None) or config_dir().joinpath("config.toml")
+
+def _load(args: argparse.Namespace) -> dict:
+	"""
+	Return the config given in `args`, or the default config if none was given.
 	"""
-	verify_config_exists(config_path)
-	return tomllib.loads(config_path.read_text())
+	import discord_launcher_lib
+	return discord_launcher_lib.normalize_config(read_config(_config_path(args)))
+
+def launch_cache_path() -> Path:
+	"""
+	Return the path of the cached launch command used by `run --fast-path`.
+	"""
+	return Path(os.environ.get("XDG_CACHE_HOME") or Path.home().joinpath(".cache")).joinpath(APP_NAME, "run.cache")
+
+def _write_launch_cache(config_path: Path, config: dict):
+	"""
+	Save the resolved launch command for `config`, keyed by the config file's modification time.
+	"""
+	import discord_launcher_lib, json
+	cache_path: Path = launch_cache_path()
+	try:
+		cache: dict = {
+			"config": os.path.abspath(config_path),
+			"mtime": os.stat(config_path).st_mtime_ns,
+			"binary": str(discord_launcher_lib.get_discord_binary(config)),
+			"launch_args": config["launch_args"],
+			"cwd": config["working_directory"],
+		}
+		cache_path.parent.mkdir(parents = True, exist_ok = True)
+		cache_path.write_text(json.dumps(cache))
+	except OSError as err:
+		logging.debug("Couldn't write launch cache at \"{}\": {}".format(cache_path, err))
+
+def _exec_cached_launch(config_path: Path, launch_args: list[str]):
+	"""
+	Replace this process with Discord using the cached launch command.
+
+	Only returns if there is no usable cache, i.e. it is missing, unreadable, or the config was modified since it was written.
+	"""
+	import json
+	cache_path: Path = launch_cache_path()
+	try:
+		with open(cache_path, "rb") as file:
+			cache: dict = json.load(file)
+		if cache["config"] != os.path.abspath(config_path) or cache["mtime"] != os.stat(config_path).st_mtime_ns:
+			logging.debug("Launch cache at \"{}\" is stale".format(cache_path))
+			return
+		argv: list[str] = [cache["binary"]] + (launch_args or cache["launch_args"])
+		if not os.access(argv[0], os.X_OK):
+			logging.debug("Cached Discord binary \"{}\" is not executable".format(argv[0]))
+			return
+		logging.debug("Running Discord at '{}' from the launch cache using launch args {}".format(argv[0], argv[1:]))
+		previous_cwd: str = os.getcwd()
+		os.chdir(cache["cwd"])
+		try:
+			os.execv(argv[0], argv)
+		except OSError:
+			# Carry on down the normal path from where we started, so relative paths still resolve the same
+			os.chdir(previous_cwd)
+			raise
+	except (OSError, ValueError, KeyError, TypeError) as err:
+		logging.debug("Couldn't use launch cache at \"{}\": {}".format(cache_path, err))
+
+def _installed(args: argparse.Namespace) -> tuple[dict, dict]:
+	"""
+	Return the config given in `args` and the build info of its Discord installation.
+	"""
+	import discord_launcher_lib
+	config: dict = _load(args)
+	return (config, discord_launcher_lib.get_installed_build_info(config))
 
 def _get_latest_version(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
+	import discord_launcher_lib
+	config: dict = _load(args)
 	latest_version: tuple[int, int, int] = discord_launcher_lib.get_latest_discord_version(channel = config["release_channel"])
 	print(discord_launcher_lib.format_version(latest_version))
 
 def _get_installed_version(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
-	installed_build_info: dict = discord_launcher_lib.get_installed_build_info(config)
-	print(installed_build_info["version"])
+	print(_installed(args)[1]["version"])
 
 def _get_installed_channel(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
-	installed_build_info: dict = discord_launcher_lib.get_installed_build_info(config)
-	print(installed_build_info["releaseChannel"])
+	print(_installed(args)[1]["releaseChannel"])
 
 def _check_updates(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
-	build_info: dict = discord_launcher_lib.get_installed_build_info(config)
-	update_info: tuple[discord_launcher_lib.VersionOrd, tuple[int, int, int], tuple[int, int, int]] = discord_launcher_lib.check_for_updates(config)
-	match update_info[0]:
-		case discord_launcher_lib.VersionOrd.OLDER_THAN:
-			print("There is an update available for Discord {}. Installed version is {}.{}.{} and latest available version is {}.{}.{}.".format(build_info["releaseChannel"], update_info[1][0], update_info[1][1], update_info[1][2], update_info[2][0], update_info[2][1], update_info[2][2]))
-		case discord_launcher_lib.VersionOrd.EQUAL_TO:
-			print("The currently installed version of Discord {} is {}.{}.{}, which is the latest available version.".format(build_info["releaseChannel"], update_info[1][0], update_info[1][1], update_info[1][2]))
-		case discord_launcher_lib.VersionOrd.NEWER_THAN:
-			print("The currently installed version of Discord {} is {}.{}.{} and latest available version is {}.{}.{}.".format(build_info["releaseChannel"], update_info[1][0], update_info[1][1], update_info[1][2], update_info[2][0], update_info[2][1], update_info[2][2]))
-		case discord_launcher_lib.VersionOrd.CHANNEL_MISMATCH:
-			print("The currently installed version of Discord is of the release channel {}, version {}.{}.{}, but the config specifies release channel {}.".format(build_info["releaseChannel"], update_info[1][0], update_info[1][1], update_info[1][2], config["release_channel"]))
+	import discord_launcher_lib
+	(config, build_info) = _installed(args)
+	channel: str = build_info["releaseChannel"]
+	try:
+		update_info: tuple[discord_launcher_lib.Ord, tuple[int, int, int], tuple[int, int, int]] = discord_launcher_lib.check_for_updates(config, build_info = build_info)
+	except discord_launcher_lib.ReleaseChannelMismatchError:
+		(i0, i1, i2) = discord_launcher_lib.parse_version(build_info["version"])
+		print(f"The currently installed version of Discord is of the release channel {channel}, version {i0}.{i1}.{i2}, but the config specifies release channel {config['release_channel']}.")
+		return
+	# Bind the members once; `match` can't use bare local names as value patterns.
+	ord_enum = discord_launcher_lib.Ord
+	(older, equal, newer) = (ord_enum.LESS_THAN, ord_enum.EQUAL_TO, ord_enum.GREATER_THAN)
+	(version_ord, (i0, i1, i2), (l0, l1, l2)) = update_info
+	if version_ord is older:
+		print(f"There is an update available for Discord {channel}. Installed version is {i0}.{i1}.{i2} and latest available version is {l0}.{l1}.{l2}.")
+	elif version_ord is equal:
+		print(f"The currently installed version of Discord {channel} is {i0}.{i1}.{i2}, which is the latest available version.")
+	elif version_ord is newer:
+		print(f"The currently installed version of Discord {channel} is {i0}.{i1}.{i2} and latest available version is {l0}.{l1}.{l2}.")
 
 def _stop(args: argparse.Namespace):
+	import discord_launcher_lib
 	try:
-		discord_launcher_lib.stop_discord()
+		if not discord_launcher_lib.stop_discord():
+			sys.exit(1)
 	except discord_launcher_lib.DiscordNotRunningError as err:
 		logging.error(err)
 
 def _update(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
+	import discord_launcher_lib
+	config: dict = _load(args)
 	discord_launcher_lib.update_discord(config, strict_channel=not args.allow_channel_swap)
 
 def _install(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
+	import discord_launcher_lib
+	config: dict = _load(args)
 	discord_launcher_lib.install_discord(config)
 
 def _install_desktop_entry(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
+	import discord_launcher_lib
+	config: dict = _load(args)
 	discord_launcher_lib.create_desktop_entry(config, force = True)
 
 def _run(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
+	config_path: Path = _config_path(args)
+	if args.fast_path:
+		_exec_cached_launch(config_path, args.unhandled)
+	import discord_launcher_lib
+	config: dict = discord_launcher_lib.normalize_config(read_config(config_path))
+	_write_launch_cache(config_path, config)
 	discord_launcher_lib.run_discord(config, launch_args = args.unhandled)
 
 def _update_and_run(args: argparse.Namespace):
-	config_file: Path = args.config
-	config: dict = read_config(config_file)
+	import discord_launcher_lib
+	config_path: Path = _config_path(args)
+	config: dict = discord_launcher_lib.normalize_config(read_config(config_path))
+	_write_launch_cache(config_path, config)
 	discord_launcher_lib.update_and_run_discord(config, launch_args = args.unhandled, strict_channel=not args.allow_channel_swap)
 
 def _add_update_args(parser: argparse.ArgumentParser):
@@ -102,61 +234,176 @@ def _add_update_args(parser: argparse.ArgumentParser):
 def _add_run_args(parser: argparse.ArgumentParser):
 	parser.add_argument("unhandled", metavar = "DISCORD ARGS", help = "Pass all unhandled/unrecognized arguments to Discord INSTEAD of the configured launch options.", nargs = "*")
 
-def main():
+_EPILOG: str = "Any unhandled arguments will be passed to Discord to OVERRIDE the configured launch options. To invoke this, you can pass `--`, and any following arguments will always be unhandled."
+
+def _configure_latest_version(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("latest-version", help = "Return the latest Discord version number.")
+	parser.set_defaults(func = _get_latest_version)
+
+def _configure_installed_version(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("installed-version", help = "Return the installed Discord version number.")
+	parser.set_defaults(func = _get_installed_version)
+
+def _configure_installed_channel(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("installed-channel", help = "Return the installed Discord channel.")
+	parser.set_defaults(func = _get_installed_channel)
+
+def _configure_check_updates(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("check-updates", help = "Check if the installed Discord has an update available.")
+	parser.set_defaults(func = _check_updates)
+
+def _configure_stop(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("stop", help = "Attempt to stop a running Discord launcher instance.")
+	parser.set_defaults(func = _stop)
+
+def _configure_update(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("update", help = "Update Discord if there is an update available.")
+	parser.set_defaults(func = _update)
+	parser.add_argument("--force-update", "-f", action = "store_true", help = "Force install an update, even if an existing install can't be detected or isn't older than the latest version.")
+	_add_update_args(parser)
+
+def _configure_run(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("run", help = "Run the Discord installation, WITHOUT updating. If there is an update available, Discord may refuse to work.", epilog = _EPILOG)
+	parser.add_argument("--fast-path", "-F", action = "store_true", help = "Run Discord directly from the launch command cached by the last `run` or `update-run`, if the config hasn't changed since. This skips reading the config and the launcher's DBus service, so `stop` won't work for this instance.")
+	_add_run_args(parser)
+	parser.set_defaults(func = _run)
+
+def _configure_update_run(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("update-run", help = "Update if there is an update available and run the Discord installation.", epilog = _EPILOG)
+	_add_update_args(parser)
+	_add_run_args(parser)
+	parser.set_defaults(func = _update_and_run)
+
+def _configure_install(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("install", help = "Install Discord. If there is an existing installation, it WILL be removed!")
+	parser.set_defaults(func = _install)
+
+def _configure_install_desktop_entry(mode_subparser: argparse._SubParsersAction):
+	parser = mode_subparser.add_parser("install-desktop-entry", help = "Install a Discord desktop entry. This will NOT work until you've installed Discord!")
+	parser.set_defaults(func = _install_desktop_entry)
+
+_LOG_LEVELS: dict[str, int] = {
+	"debug": logging.DEBUG,
+	"info": logging.INFO,
+	"warn": logging.WARNING,
+	"warning": logging.WARNING,
+	"error": logging.ERROR,
+}
+
+# Mode name -> function adding that mode's subparser. Order is the order shown in `--help`.
+_MODES: dict[str, Callable[[argparse._SubParsersAction], None]] = {
+	"latest-version": _configure_latest_version,
+	"installed-version": _configure_installed_version,
+	"installed-channel": _configure_installed_channel,
+	"check-updates": _configure_check_updates,
+	"stop": _configure_stop,
+	"update": _configure_update,
+	"run": _configure_run,
+	"update-run": _configure_update_run,
+	"install": _configure_install,
+	"install-desktop-entry": _configure_install_desktop_entry,
+}
+
+# Modes that start a DBus service process, and so need multiprocessing set up.
+_SPAWNING_MODES: frozenset[str] = frozenset(("run", "update-run"))
+
+# Global options that take a value in the following argument.
+_VALUE_OPTIONS: tuple[str, ...] = ("--config", "-c", "--log-level", "-v")
+
+def _is_value_option(arg: str) -> bool:
+	"""
+	Return whether `arg` is a global option that takes a value in the following argument, including the abbreviations argparse accepts for them.
+	"""
+	return arg in _VALUE_OPTIONS or (len(arg) > 2 and arg.startswith("--") and any(option.startswith(arg) for option in _VALUE_OPTIONS))
+
+def _peek_mode(argv: list[str]) -> str | None:
+	"""
+	Return the mode named in `argv` without running argparse, or None if it couldn't be determined.
+
+	Help flags before the mode return None, so the full parser is built for them.
+	"""
+	skip_value = False
+	for arg in argv:
+		if skip_value:
+			skip_value = False
+			if not arg.startswith("-"):
+				continue
+		if arg in ("-h", "--help", "--"):
+			return None
+		if _is_value_option(arg):
+			skip_value = True
+		elif not arg.startswith("-"):
+			return arg
+	return None
+
+def _peek_log_level(argv: list[str]) -> str:
+	"""
+	Return the logging level given in `argv` without running argparse, so logging can be set up first.
+
+	This is only a best guess for anything logged while parsing; `main` applies the level argparse parsed afterwards.
+	"""
+	level: str = "info"
+	skip_value = False
+	for (i, arg) in enumerate(argv):
+		if skip_value:
+			skip_value = False
+			if not arg.startswith("-"):
+				continue
+		if arg in ("--log-level", "-v"):
+			if i + 1 < len(argv) and not argv[i + 1].startswith("-"):
+				level = argv[i + 1]
+			skip_value = True
+		elif arg.startswith("--log-level="):
+			level = arg.removeprefix("--log-level=")
+		elif arg.startswith("-v") and not arg.startswith("--"):
+			level = arg.removeprefix("-v")
+		elif _is_value_option(arg):
+			skip_value = True
+		elif arg == "--" or not arg.startswith("-"):
+			# Anything past the mode belongs to the mode (or to Discord)
+			break
+	return level
+
+def _build_parser(modes: collections.abc.Iterable[str]) -> argparse.ArgumentParser:
+	"""
+	Build the argument parser with only the subparsers for `modes`.
+	"""
 	parser = argparse.ArgumentParser(
 		prog = APP_NAME,
 		description = "Launch and auto-update Discord.",
-		epilog = "Any unhandled arguments will be passed to Discord to OVERRIDE the configured launch options. To invoke this, you can pass `--`, and any following arguments will always be unhandled.",
+		epilog = _EPILOG,
 		formatter_class=argparse.ArgumentDefaultsHelpFormatter
 	)
-	parser.add_argument("--config", "-c", default = CONFIG_FILE, metavar = "CONFIG FILE", help = "Use a custom config location.", nargs = "?", type = Path)
+	# The default is resolved lazily by `_load`, so it's suppressed here and spelled out in the help instead.
+	parser.add_argument("--config", "-c", default = argparse.SUPPRESS, metavar = "CONFIG FILE", help = "Use a custom config location. (default: ~/.local/share/{}/config.toml)".format(APP_NAME), nargs = "?", type = Path)
 	parser.add_argument("--log-level", "-v", default = "info", metavar = "LOGGING LEVEL", help = "Set the logging level. Possible options are `debug`, `info`, `warn`, and `error`.", nargs = "?")
 	mode_subparser = parser.add_subparsers(prog = "mode", dest = "mode", help = "Operating mode.")
-	get_latest_version_parser = mode_subparser.add_parser("latest-version", help = "Return the latest Discord version number.")
-	get_latest_version_parser.set_defaults(func=_get_latest_version)
-	get_installed_version_parser = mode_subparser.add_parser("installed-version", help = "Return the installed Discord version number.")
-	get_installed_version_parser.set_defaults(func=_get_installed_version)
-	get_installed_channel_parser = mode_subparser.add_parser("installed-channel", help = "Return the installed Discord channel.")
-	get_installed_channel_parser.set_defaults(func=_get_installed_channel)
-	check_update_parser = mode_subparser.add_parser("check-updates", help = "Check if the installed Discord has an update available.")
-	check_update_parser.set_defaults(func=_check_updates)
-	stop_parser = mode_subparser.add_parser("stop", help = "Attempt to stop a running Discord launcher instance.")
-	stop_parser.set_defaults(func=_stop)
-	update_parser = mode_subparser.add_parser("update", help = "Update Discord if there is an update available.")
-	update_parser.set_defaults(func=_update)
-	update_parser.add_argument("--force-update", "-f", action = "store_true", help = "Force install an update, even if an existing install can't be detected or isn't older than the latest version.")
-	_add_update_args(update_parser)
-	run_parser = mode_subparser.add_parser("run", help = "Run the Discord installation, WITHOUT updating. If there is an update available, Discord may refuse to work.", epilog = "Any unhandled arguments will be passed to Discord to OVERRIDE the configured launch options. To invoke this, you can pass `--`, and any following arguments will always be unhandled.")
-	_add_run_args(run_parser)
-	run_parser.set_defaults(func = _run)
-	update_and_run_parser = mode_subparser.add_parser("update-run", help = "Update if there is an update available and run the Discord installation.", epilog = "Any unhandled arguments will be passed to Discord to OVERRIDE the configured launch options. To invoke this, you can pass `--`, and any following arguments will always be unhandled.")
-	_add_update_args(update_and_run_parser)
-	_add_run_args(update_and_run_parser)
-	update_and_run_parser.set_defaults(func = _update_and_run)
-	install_parser = mode_subparser.add_parser("install", help = "Install Discord. If there is an existing installation, it WILL be removed!")
-	install_parser.set_defaults(func=_install)
-	install_desktop_entry_parser = mode_subparser.add_parser("install-desktop-entry", help = "Install a Discord desktop entry. This will NOT work until you've installed Discord!")
-	install_desktop_entry_parser.set_defaults(func=_install_desktop_entry)
+	for mode in modes:
+		_MODES[mode](mode_subparser)
+	return parser
+
+def main():
+	logging.basicConfig(level = _LOG_LEVELS.get(_peek_log_level(sys.argv[1:]).lower(), logging.INFO))
+
+	# Only build the subparser that's actually needed, and fall back to all of them for help or unknown modes.
+	mode: str | None = _peek_mode(sys.argv[1:])
+	parser = _build_parser((mode,) if mode in _MODES else _MODES)
 
 	args = parser.parse_args()
+	# The peek above doesn't understand every form argparse accepts (like abbreviations), so the parsed level is the one that counts.
+	logging.getLogger().setLevel(_LOG_LEVELS.get((args.log_level or "info").lower(), logging.INFO))
 
-	match args.log_level.lower():
-		case "debug":
-			logging.basicConfig(level = logging.DEBUG)
-		case "warn" | "warning":
-			logging.basicConfig(level = logging.WARNING)
-		case "error":
-			logging.basicConfig(level = logging.ERROR)
-		case _:
-			logging.basicConfig(level = logging.INFO)
+	if args.mode in _SPAWNING_MODES:
+		import multiprocessing
+		# This should *only* run once.
+		multiprocessing.freeze_support()
+		multiprocessing.set_start_method("spawn")
 
 	if args.mode:
 		args.func(args)
 	else:
-		parser.parse_args(["--help"])
+		parser.print_help()
+		parser.exit(0)
 
 if __name__ == "__main__":
-	# This should *only* run once.
-	freeze_support()
-	multiprocessing.set_start_method("spawn")
 	main()
@@ -1,31 +1,51 @@
-import argparse, dasbus, discord_launcher_lib, gi, multiprocessing, logging, queue, tomlkit, traceback
+from __future__ import annotations
+import argparse, discord_launcher_lib, functools, gi, logging, threading, time, traceback
 gi.require_version("Gdk", "3.0")
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gdk, GdkPixbuf, GLib, Gtk
-from multiprocessing import freeze_support, Pipe, Process
-from multiprocessing.connection import Connection
+from gi.repository import Gdk, GLib, Gtk
 from pathlib import Path
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+	import tomlkit
 
 APP_NAME: str = "discord_launcher_gui"
 APP_ID: str = ".".join(discord_launcher_lib.NAMESPACE)
-CONFIG_DIR: Path = Path.home().joinpath(".local/share").joinpath("discord_launcher")
+CONFIG_DIR: Path = Path.home().joinpath(".local/share", "discord_launcher")
 CONFIG_FILE: Path = CONFIG_DIR.joinpath("config.toml")
 UI_FILE: Path = Path(__file__).parent.resolve().joinpath("launcher.glade")
+# Read once, so every builder can be made without going back to the disk
+_UI_XML: str = UI_FILE.read_bytes().decode("utf-8")
 MESSAGE_TIMEOUT: int = 1500
+VALIDATE_DELAY: int = 150
 INFO_ICON: str = "dialog-information"
 QUESTION_ICON: str = "dialog-question"
 WARNING_ICON: str = "dialog-warning"
 ERROR_ICON: str = "dialog-error"
 
 def format_error(err: BaseException):
-	string = err.__class__.__name__ + ": " + str(err)
-	if len(err.__notes__) > 0:
-		string += "; " + "; ".join(err.__notes__)
-	return string
-
-def assert_with(expression: bool, exception: Exception):
-	if not expression:
-		raise exception()
+	# `__notes__` only exists once a note has been added
+	notes = getattr(err, "__notes__", ())
+	base = f"{type(err).__name__}: {err}"
+	if isinstance(err, BaseExceptionGroup):
+		base += "; " + "; ".join(format_error(sub_err) for sub_err in err.exceptions)
+	return base if not notes else base + "; " + "; ".join(notes)
+
+# Path -> (time checked, whether it existed), so bursts of validation don't stat the same paths over and over.
+_stat_cache: dict[str, tuple[float, bool]] = {}
+STAT_CACHE_TTL: float = 1.0
+
+def _cached_exists(path: Path) -> bool:
+	"""
+	Return whether `path` exists, reusing a result from the last `STAT_CACHE_TTL` seconds if there is one.
+	"""
+	key = str(path)
+	now = time.monotonic()
+	cached = _stat_cache.get(key)
+	if cached is not None and now - cached[0] < STAT_CACHE_TTL:
+		return cached[1]
+	result = path.exists()
+	_stat_cache[key] = (now, result)
+	return result
 
 """
 Default configuration stuff.
@@ -34,7 +54,11 @@ Default configuration stuff.
 _DEFAULT_DISCORD_PATH: Path = CONFIG_DIR.joinpath("Discord")
 _DEFAULT_WORKING_DIRECTORY: Path = Path("/usr/bin")
 _DEFAULT_LAUNCHER_PATH: Path = Path(__file__).parent.resolve().joinpath("discord_launcher_gui.py")
-_DEFAULT_DESKTOP_ENTRY_PATH: Path = Path.home().joinpath(".local/share/applications/{}.desktop".format(discord_launcher_lib.SERVICE_NAME))
+_DEFAULT_DESKTOP_ENTRY_PATH: Path = Path(discord_launcher_lib.DEFAULT_DESKTOP_PATH)
+
+# Only the launcher path can vary between calls to `default_config`, so everything around it is built once here.
+_DEFAULT_CONFIG_HEAD: str = "discord_path = \"{}\"\nworking_directory = \"{}\"\nlaunch_args = []\nlauncher_path = \"".format(_DEFAULT_DISCORD_PATH, _DEFAULT_WORKING_DIRECTORY)
+_DEFAULT_CONFIG_TAIL: str = "\"\nrelease_channel = \"stable\"\n\n[desktop_entry]\nenabled = true\npath = \"{}\"\ntryexec = true\nsetup_action = true\n".format(_DEFAULT_DESKTOP_ENTRY_PATH)
 
 class InvalidConfigValuesError(Exception):
 	def __init__(self):
@@ -44,52 +68,87 @@ def default_config(launcher_path = _DEFAULT_LAUNCHER_PATH) -> str:
 	"""
 	Return a default config file.
 	"""
-	return "discord_path = \"{}\"\nworking_directory = \"{}\"\nlaunch_args = []\nlauncher_path = \"{}\"\nrelease_channel = \"stable\"\n\n[desktop_entry]\nenabled = true\npath = \"{}\"\ntryexec = true\nsetup_action = true\n".format(_DEFAULT_DISCORD_PATH, _DEFAULT_WORKING_DIRECTORY, launcher_path, _DEFAULT_DESKTOP_ENTRY_PATH)
+	return _DEFAULT_CONFIG_HEAD + str(launcher_path) + _DEFAULT_CONFIG_TAIL
 
-def get_config(config_path: Path, launcher_path = Path(__file__).parent.resolve().joinpath("discord_launcher_gui.py")) -> (tomlkit.TOMLDocument, None | bool):
+def get_config(config_path: Path, launcher_path = Path(__file__).parent.resolve().joinpath("discord_launcher_gui.py"), prev_key: tuple[int, int] | None = None) -> (tomlkit.TOMLDocument | None, None | bool, tuple[int, int] | None):
 	"""
 	Return the config at `config_path` or defaults if the file doesn't already exist.
 
 	The defaults shouldn't be assumed to be usable; they are intended to be edited later.
+
+	Also returns a key made of the file's modification time and size, or None if the defaults were used. If this matches `prev_key`, the file is unchanged and isn't read again, and the returned config is None.
 	"""
+	import tomlkit
 	read_error = True
 	try:
+		stat = config_path.stat()
+		key = (stat.st_mtime_ns, stat.st_size)
+		if key == prev_key:
+			return (None, None, key)
 		text = config_path.read_text()
 		read_error = False
-		return (tomlkit.parse(text), None)
+		return (tomlkit.parse(text), None, key)
 	except Exception:
 		text = default_config(launcher_path = launcher_path)
-		return (tomlkit.parse(text), read_error)
+		return (tomlkit.parse(text), read_error, None)
+
+@functools.cache
+def _config_schema() -> tuple[tuple[tuple[str, type], ...], tuple[tuple[str, type], ...]]:
+	"""
+	Return the expected (key, type) pairs of the top level and of the `desktop_entry` table of the configuration.
+
+	This is built on first use so tomlkit isn't imported before it's needed.
+	"""
+	import tomlkit
+	return (
+		(
+			("discord_path", tomlkit.items.String),
+			("working_directory", tomlkit.items.String),
+			("launch_args", tomlkit.items.Array),
+			("launcher_path", tomlkit.items.String),
+			("release_channel", tomlkit.items.String),
+		),
+		(
+			("path", tomlkit.items.String),
+			("tryexec", bool),
+			("setup_action", bool),
+		),
+	)
 
 def verify_config_value_types(config: tomlkit.TOMLDocument):
 	"""
 	Assert that the values in the configuration are correct.
 	"""
-	assert_with(type(config["discord_path"]) is tomlkit.items.String, TypeError)
-	assert_with(type(config["working_directory"]) is tomlkit.items.String, TypeError)
-	assert_with(type(config["launch_args"]) is tomlkit.items.Array, TypeError)
-	for arg in config["launch_args"]:
-		assert_with(type(arg) is tomlkit.items.String, TypeError)
-	assert_with(type(config["launcher_path"]) is tomlkit.items.String, TypeError)
-	assert_with(type(config["release_channel"]) is tomlkit.items.String, TypeError)
-
-	assert_with(type(config["desktop_entry"]["enabled"]) is bool, TypeError)
-	if config["desktop_entry"]["enabled"]:
-		assert_with(type(config["desktop_entry"]["path"]) is tomlkit.items.String, TypeError)
-		assert_with(type(config["desktop_entry"]["tryexec"]) is bool, TypeError)
-		assert_with(type(config["desktop_entry"]["setup_action"]) is bool, TypeError)
+	import tomlkit
+	(top_schema, desktop_entry_schema) = _config_schema()
+	for (key, value_type) in top_schema:
+		if not isinstance(config[key], value_type):
+			raise TypeError(key)
+	if not all(isinstance(arg, tomlkit.items.String) for arg in config["launch_args"]):
+		raise TypeError("launch_args")
+
+	desktop_entry = config["desktop_entry"]
+	if not isinstance(desktop_entry["enabled"], bool):
+		raise TypeError("desktop_entry.enabled")
+	if desktop_entry["enabled"]:
+		for (key, value_type) in desktop_entry_schema:
+			if not isinstance(desktop_entry[key], value_type):
+				raise TypeError("desktop_entry." + key)
 
 def verify_config_values(config: tomlkit.TOMLDocument):
 	"""
 	Assert that the values in the config are valid.
 	"""
-	assert_with(Path(config["discord_path"]).parent.exists(), InvalidConfigValuesError)
-	assert_with(Path(config["working_directory"]).exists(), InvalidConfigValuesError)
-	assert_with(Path(config["launcher_path"]).exists(), InvalidConfigValuesError)
-	assert_with(config["release_channel"] in ["stable", "ptb", "canary"], InvalidConfigValuesError)
+	if not (
+		_cached_exists(Path(config["discord_path"]).parent)
+		and _cached_exists(Path(config["working_directory"]))
+		and _cached_exists(Path(config["launcher_path"]))
+		and config["release_channel"] in ("stable", "ptb", "canary")
+	):
+		raise InvalidConfigValuesError()
 
-	if config["desktop_entry"]["enabled"]:
-		assert_with(Path(config["desktop_entry"]["path"]).parent.exists(), InvalidConfigValuesError)
+	if config["desktop_entry"]["enabled"] and not _cached_exists(Path(config["desktop_entry"]["path"]).parent):
+		raise InvalidConfigValuesError()
 
 """
 The app stuff. This is where the fun begins!
@@ -97,91 +156,122 @@ The app stuff. This is where the fun begins!
 
 def _get_builder() -> Gtk.Builder:
 		builder: Gtk.Builder = Gtk.Builder()
-		builder.add_from_file(str(UI_FILE))
+		builder.add_from_string(_UI_XML)
 		return builder
 
-def _check_latest_version(pipe: Connection):
-	try:
-		pipe.send(discord_launcher_lib.format_version(discord_launcher_lib.get_latest_discord_version()))
-	except Exception as err:
-		pipe.send("Error: " + str(err))
-
-def _check_installed_version(pipe: Connection, config: dict):
-	try:
-		pipe.send(discord_launcher_lib.get_installed_build_info(config)["version"])
-	except Exception as err:
-		pipe.send("Error: " + str(err))
-
 class SetupApp:
+	# Config directories already created (or found to exist) by this process
+	_ensured_dirs: set[Path] = set()
+	# Builder objects that are bound to attributes of the same name
+	_WIDGETS: tuple[str, ...] = (
+		"tab_stack",
+		"config_path_label",
+		# Important setup_tab widgets
+		"installed_version_label",
+		"latest_version_label",
+		"update_run_discord_button",
+		"install_discord_button",
+		"run_discord_button",
+		"update_discord_button",
+		"uninstall_discord_button",
+		# Important friendly_editor_tab widgets
+		"discord_path_entry",
+		"working_directory_entry",
+		"add_argument_button",
+		"launch_arguments_box",
+		"launcher_path_entry",
+		"release_channel_combo",
+		"desktop_entry_enabled",
+		"desktop_entry_path_entry",
+		"tryexec_enabled",
+		"setup_action_enabled",
+		"friendly_editor_reload_button",
+		"friendly_editor_save_button",
+		# Important editor_tab widgets
+		"editor_text_view",
+		"editor_reload_button",
+		"editor_save_button",
+		# Dialog widgets
+		"error_dialog",
+		"error_label",
+		"error_text",
+		"error_copy_button",
+		"question_dialog",
+		"question_yes_button",
+		"question_no_button",
+		"question_label",
+	)
+	# (builder object ID, signal, handler method name), connected in this order
+	_SIGNALS: tuple[tuple[str, str, str], ...] = (
+		("editor_text_buffer", "changed", "flag_modified"),
+		("tab_stack", "notify::visible-child", "verify_config"),
+		("tab_stack", "notify::visible-child", "update_stale_tab"),
+		("update_run_discord_button", "clicked", "update_run_discord"),
+		("install_discord_button", "clicked", "install_discord"),
+		("run_discord_button", "clicked", "run_discord"),
+		("update_discord_button", "clicked", "update_discord"),
+		("uninstall_discord_button", "clicked", "uninstall_discord"),
+		("discord_path_entry", "changed", "flag_modified"),
+		("working_directory_entry", "changed", "flag_modified"),
+		("add_argument_button", "clicked", "add_launch_argument"),
+		("launcher_path_entry", "changed", "flag_modified"),
+		("release_channel_combo", "changed", "flag_modified"),
+		("desktop_entry_enabled", "toggled", "flag_modified"),
+		("desktop_entry_enabled", "toggled", "update_desktop_entry_controls_state"),
+		("desktop_entry_path_entry", "changed", "flag_modified"),
+		("tryexec_enabled", "toggled", "flag_modified"),
+		("setup_action_enabled", "toggled", "flag_modified"),
+		("friendly_editor_reload_button", "clicked", "reload_config"),
+		("friendly_editor_save_button", "clicked", "save_config"),
+		("editor_reload_button", "clicked", "reload_config"),
+		("editor_save_button", "clicked", "save_config"),
+		("error_copy_button", "clicked", "_error_copy"),
+	)
+	# Widgets whose initial label is kept as `_<name>_default`, to build on or restore later
+	_DEFAULT_TEXT_WIDGETS: tuple[str, ...] = (
+		"installed_version_label",
+		"latest_version_label",
+		"error_copy_button",
+	)
+
 	def __init__(self, config_path: Path, editor: bool = False, update: bool = False, run: bool = False):
 		"""
 		Return value indicates whether the normal operation was interrupted.
 		"""
 		builder = _get_builder()
 
-		builder.connect_signals(self)
+		for (name, signal, handler) in self._SIGNALS:
+			builder.get_object(name).connect(signal, getattr(self, handler))
 		self.disabled = False
 		# If this is true by the end of this init, we won't run an update or run command even if they were passed
 		self._halt_actions = False
 		self._flag_modified = False
 		self._flag_unsaved = False
-		self._latest_version_pipe: Connection | None = None
-		self._latest_version_process: Process | None = None
-		self.window = builder.get_object("setup_window"); assert self.window is not None
-		self.tab_stack = builder.get_object("tab_stack"); assert self.tab_stack is not None
+		self._validate_source_id: int | None = None
+		# Whether an editor tab is behind the config because it was changed from the other tab
+		self._editor_stale = False
+		self._friendly_editor_stale = False
+		# (config, its TOML text) from the last time the config was serialized or parsed from the editor
+		self._config_text: tuple[tomlkit.TOMLDocument | None, str] = (None, "")
 		self.config_path: Path = config_path
-		self.config_path_label = builder.get_object("config_path_label"); assert self.config_path_label is not None
-
-		# Important setup_tab widgets
-
-		self.installed_version_label = builder.get_object("installed_version_label"); assert self.installed_version_label is not None
-		self._installed_version_label_default = self.installed_version_label.get_text()
-		self.latest_version_label = builder.get_object("latest_version_label"); assert self.latest_version_label is not None
-		self._latest_version_label_default = self.latest_version_label.get_text()
-		self.update_run_discord_button = builder.get_object("update_run_discord_button"); assert self.update_run_discord_button is not None
-		self.install_discord_button = builder.get_object("install_discord_button"); assert self.install_discord_button is not None
-		self.run_discord_button = builder.get_object("run_discord_button"); assert self.run_discord_button is not None
-		self.update_discord_button = builder.get_object("update_discord_button"); assert self.update_discord_button is not None
-		self.uninstall_discord_button = builder.get_object("uninstall_discord_button"); assert self.uninstall_discord_button is not None
-
-		# Important friendly_editor_tab widgets
-
-		self.discord_path_entry = builder.get_object("discord_path_entry"); assert self.discord_path_entry is not None
-		self.working_directory_entry = builder.get_object("working_directory_entry"); assert self.working_directory_entry is not None
-		self.add_argument_button = builder.get_object("add_argument_button"); assert self.add_argument_button is not None
-		self.launch_arguments_box = builder.get_object("launch_arguments_box"); assert self.launch_arguments_box is not None
-		self.launcher_path_entry = builder.get_object("launcher_path_entry"); assert self.launcher_path_entry is not None
-
-		self.release_channel_combo = builder.get_object("release_channel_combo"); assert self.release_channel_combo is not None
-		self.desktop_entry_enabled = builder.get_object("desktop_entry_enabled"); assert self.desktop_entry_enabled is not None
-		self.desktop_entry_path_entry = builder.get_object("desktop_entry_path_entry"); assert self.desktop_entry_path_entry is not None
-		self.tryexec_enabled = builder.get_object("tryexec_enabled"); assert self.tryexec_enabled is not None
-		self.setup_action_enabled = builder.get_object("setup_action_enabled"); assert self.setup_action_enabled is not None
-
-		self.friendly_editor_reload_button = builder.get_object("friendly_editor_reload_button"); assert self.friendly_editor_reload_button is not None
-		self.friendly_editor_save_button = builder.get_object("friendly_editor_save_button"); assert self.friendly_editor_save_button is not None
-
-		# Important editor_tab widgets
-
-		self.editor_text_view = builder.get_object("editor_text_view"); assert self.editor_text_view is not None
-		self.editor_reload_button = builder.get_object("editor_reload_button"); assert self.editor_reload_button is not None
-		self.editor_save_button = builder.get_object("editor_save_button"); assert self.editor_save_button is not None
-
-		# Dialog widgets
-
-		self.error_dialog = builder.get_object("error_dialog"); assert self.error_dialog is not None
-		self.error_label = builder.get_object("error_label"); assert self.error_label is not None
-		self.error_text = builder.get_object("error_text"); assert self.error_text is not None
-		self.error_copy_button = builder.get_object("error_copy_button"); assert self.error_copy_button is not None
-		self._error_copy_button_default = self.error_copy_button.get_label()
+		self.window = builder.get_object("setup_window"); assert self.window is not None
+		for name in self._WIDGETS:
+			widget = builder.get_object(name)
+			assert widget is not None, name
+			setattr(self, name, widget)
+		for name in self._DEFAULT_TEXT_WIDGETS:
+			setattr(self, "_{}_default".format(name), getattr(self, name).get_label())
 
-		self.question_dialog = builder.get_object("question_dialog"); assert self.question_dialog is not None
-		self.question_yes_button = builder.get_object("question_yes_button"); assert self.question_yes_button is not None
-		self.question_no_button = builder.get_object("question_no_button"); assert self.question_no_button is not None
-		self.question_label = builder.get_object("question_label"); assert self.question_label is not None
+		# Friendly editor widgets that are simply enabled or disabled along with the editor
+		self._editor_widgets = (self.discord_path_entry, self.working_directory_entry, self.add_argument_button, self.launcher_path_entry, self.release_channel_combo, self.desktop_entry_enabled)
 
 		self.last_page = self.tab_stack.get_visible_child_name()
-		self.clipboard = Gtk.Clipboard.get_for_display(Gdk.Display.get_default(), Gdk.SELECTION_CLIPBOARD)
+		self._clipboard: Gtk.Clipboard | None = None
+		# (row box, entry) of every launch argument in the friendly editor, in order
+		self._arg_rows: list[tuple[Gtk.Box, Gtk.Entry]] = []
+		# The config as last read from the file, and that file's (modification time, size)
+		self._loaded_config: tomlkit.TOMLDocument | None = None
+		self._loaded_config_key: tuple[int, int] | None = None
 
 		self.reload_config(notify = False)
 		self.update_config_controls()
@@ -215,10 +305,17 @@ class SetupApp:
 				self.window.show_all()
 				Gtk.main()
 
+	@property
+	def clipboard(self) -> Gtk.Clipboard:
+		"""
+		The clipboard, looked up the first time it's needed.
+		"""
+		if self._clipboard is None:
+			self._clipboard = Gtk.Clipboard.get_for_display(Gdk.Display.get_default(), Gdk.SELECTION_CLIPBOARD)
+		return self._clipboard
+
 	def error(self, err: Exception, title: str = "Error", action: str | None = None, icon_name: str = ERROR_ICON) -> int:
-		text = ""
-		for line in traceback.format_exception(err):
-			text += line
+		text = "".join(traceback.format_exception(err))
 		self.error_text.get_buffer().set_text(text)
 		m: str = "The following exception occurred"
 		if action is not None:
@@ -302,7 +399,7 @@ class SetupApp:
 		self.question_no_button.set_label("")
 
 	def config_dict(self) -> dict:
-		return self.config.value
+		return discord_launcher_lib.normalize_config(self.config.value)
 
 	def update_config_path_label(self):
 		self.config_path_label.set_label("Config path: " + str(self.config_path))
@@ -316,19 +413,21 @@ class SetupApp:
 
 	def update_latest_version_label(self):
 		self.latest_version_label.set_label(self._latest_version_label_default + "...")
-		(self._latest_version_pipe, pipe) = Pipe(False)
-		self._latest_version_process = Process(target = _check_latest_version, args = (pipe,))
-		self._latest_version_process.start()
-		GLib.timeout_add(200, self._check_latest_version_label)
-
-	def _check_latest_version_label(self):
-		if self._latest_version_pipe.poll(timeout = 0):
-			self.latest_version_label.set_label(self._latest_version_label_default + self._latest_version_pipe.recv())
-			self._latest_version_pipe = None
-			self._latest_version_process = None
-		else:
-			# Come back later
-			GLib.timeout_add(200, self._check_latest_version_label)
+		threading.Thread(target = self._check_latest_version, daemon = True).start()
+
+	def _check_latest_version(self):
+		"""
+		Fetch the latest version in a worker thread and hand the result back to the main loop.
+		"""
+		try:
+			text = discord_launcher_lib.format_version(discord_launcher_lib.get_latest_discord_version())
+		except Exception as err:
+			text = "Error: " + str(err)
+		GLib.idle_add(self._set_latest_version_label, text)
+
+	def _set_latest_version_label(self, text: str) -> bool:
+		self.latest_version_label.set_label(self._latest_version_label_default + text)
+		return GLib.SOURCE_REMOVE
 
 	def add_launch_argument(self, *args, arg: str | None = None):
 		arg_box = Gtk.Box(orientation = Gtk.Orientation.HORIZONTAL, spacing = 6)
@@ -344,9 +443,11 @@ class SetupApp:
 		remove_button.connect("clicked", self.remove_launch_argument, arg_box)
 		arg_box.pack_end(remove_button, False, False, 0)
 		arg_box.show_all()
+		self._arg_rows.append((arg_box, arg_entry))
 		self.flag_modified()
 
 	def remove_launch_argument(self, _, box):
+		self._arg_rows = [row for row in self._arg_rows if row[0] is not box]
 		self.launch_arguments_box.remove(box)
 		self.flag_modified()
 
@@ -354,13 +455,44 @@ class SetupApp:
 		"""
 		This does *not* check if the values are correct!
 		"""
-		self.editor_text_view.get_buffer().set_text(self.config.as_string())
+		self.update_editor_controls()
+		self.update_friendly_editor_controls()
+
+	def update_editor_controls(self):
+		"""
+		Fill the raw editor from the config.
+		"""
+		self.editor_text_view.get_buffer().set_text(self.config_text())
+		self._editor_stale = False
+
+	def config_text(self) -> str:
+		"""
+		Return the config as TOML, reusing the text it was last serialized to or parsed from.
+		"""
+		(config, text) = self._config_text
+		if config is not self.config:
+			text = self.config.as_string()
+			self._config_text = (self.config, text)
+		return text
+
+	def update_friendly_editor_controls(self):
+		"""
+		Fill the friendly editor from the config.
+		"""
+		self._friendly_editor_stale = False
 		self.discord_path_entry.set_text(self.config["discord_path"])
 		self.working_directory_entry.set_text(self.config["working_directory"])
-		for child in self.launch_arguments_box.get_children():
-			child.destroy()
-		for arg in self.config["launch_args"]:
-			self.add_launch_argument(arg = arg)
+		# Reuse the existing argument rows and only add or remove rows for the difference
+		existing = len(self._arg_rows)
+		launch_args = self.config["launch_args"]
+		for (i, arg) in enumerate(launch_args):
+			if i < existing:
+				self._arg_rows[i][1].set_text(arg)
+			else:
+				self.add_launch_argument(arg = arg)
+		for (box, _) in self._arg_rows[len(launch_args):]:
+			box.destroy()
+		del self._arg_rows[len(launch_args):]
 		self.launcher_path_entry.set_text(self.config["launcher_path"])
 		self.release_channel_combo.set_active_id(self.config["release_channel"])
 
@@ -382,11 +514,7 @@ class SetupApp:
 	def config_from_friendly_editor(self) -> tomlkit.TOMLDocument:
 		config = self.config_from_editor()
 		config["discord_path"] = self.discord_path_entry.get_text()
-		config["launch_args"] = []
-		for child in self.launch_arguments_box.get_children():
-			entry = child.get_children()[0]
-			assert entry is not None
-			config["launch_args"].append(entry.get_text())
+		config["launch_args"] = [entry.get_text() for (_, entry) in self._arg_rows]
 		config["working_directory"] = self.working_directory_entry.get_text()
 		config["launcher_path"] = self.launcher_path_entry.get_text()
 		config["release_channel"] = self.release_channel_combo.get_active_id()
@@ -398,18 +526,35 @@ class SetupApp:
 		config["desktop_entry"]["setup_action"] = self.setup_action_enabled.get_active()
 		return config
 
-	def config_from_editor(self) -> tomlkit.TOMLDocument:
+	def editor_text(self) -> str:
 		buffer = self.editor_text_view.get_buffer()
-		return tomlkit.parse(buffer.get_text(*buffer.get_bounds(), True))
+		return buffer.get_text(*buffer.get_bounds(), True)
+
+	def config_from_editor(self) -> tomlkit.TOMLDocument:
+		import tomlkit
+		return tomlkit.parse(self.editor_text())
 
 	def flag_modified(self, *args):
 		self._flag_modified = True
 		self._flag_unsaved = True
-
-	def verify_config(self, *args) -> bool:
+		# Coalesce bursts of changes (i.e. typing) into one validation
+		if self._validate_source_id is None:
+			self._validate_source_id = GLib.timeout_add(VALIDATE_DELAY, self._debounced_validate)
+
+	def _debounced_validate(self) -> bool:
+		self._validate_source_id = None
+		# Only the friendly editor is checked while typing.
+		# Half-typed TOML in the raw editor would fail to parse and disable the editor under the user.
+		if self.last_page == "friendly_editor_tab" and self.tab_stack.get_visible_child_name() == self.last_page:
+			self.verify_config(live = True)
+		return GLib.SOURCE_REMOVE
+
+	def verify_config(self, *args, live: bool = False) -> bool:
 		"""
 		Verify if the configuration is correct, and disable some controls if it isn't.
 
+		If `live` is True, this is a check while the user is still editing: the modified flag is left set for the next full check (i.e. when switching tabs), and the installed version isn't re-read.
+
 		This function is ugly. I'm sorry.
 		"""
 		out = False
@@ -426,11 +571,13 @@ class SetupApp:
 						verify_config_values(config)
 						logging.debug("Config is OK")
 						self.config = config
-						self.editor_text_view.get_buffer().set_text(config.as_string())
+						# Serialized when the raw editor is shown, not on every check
+						self._editor_stale = True
 						self.set_setup_state(True)
 						self.set_editor_state(True)
 						self.set_friendly_editor_state(True)
-						self.update_installed_version_label()
+						if not live:
+							self.update_installed_version_label()
 						out = True
 					case "editor_tab":
 						config = self.config_from_editor()
@@ -438,11 +585,15 @@ class SetupApp:
 						verify_config_values(config)
 						logging.debug("Config is OK")
 						self.config = config
-						self.update_config_controls()
+						# TOMLKit round-trips exactly, so the editor text is already this config serialized
+						self._config_text = (config, self.editor_text())
+						# Filled in when the friendly editor is shown, not on every check
+						self._friendly_editor_stale = True
 						self.set_setup_state(True)
 						self.set_editor_state(True)
 						self.set_friendly_editor_state(True)
-						self.update_installed_version_label()
+						if not live:
+							self.update_installed_version_label()
 						out = True
 					case _:
 						raise Exception("unexpected stack page!")
@@ -484,24 +635,38 @@ class SetupApp:
 
 		if not keep_this_page:
 			self.last_page = self.tab_stack.get_visible_child_name()
-		self._flag_modified = False
+		if not live:
+			self._flag_modified = False
 		return out
 
+	def update_stale_tab(self, *args):
+		"""
+		Refresh the newly visible editor tab if the config was changed from the other one.
+
+		This runs after `verify_config` when the visible tab changes.
+		"""
+		# Filling the controls fires their change signals, but the result is already verified
+		modified = self._flag_modified
+		match self.tab_stack.get_visible_child_name():
+			case "editor_tab":
+				if self._editor_stale:
+					self.update_editor_controls()
+			case "friendly_editor_tab":
+				if self._friendly_editor_stale:
+					self.update_friendly_editor_controls()
+		self._flag_modified = modified
+
 	def set_editor_state(self, enabled: bool):
 		self.editor_text_view.set_sensitive(enabled)
 		self.editor_save_button.set_sensitive(enabled)
 
 	def set_friendly_editor_state(self, enabled: bool):
-		self.discord_path_entry.set_sensitive(enabled)
-		self.working_directory_entry.set_sensitive(enabled)
-		for child in self.launch_arguments_box.get_children():
-			for c in child.get_children():
-				c.set_sensitive(enabled)
-		self.add_argument_button.set_sensitive(enabled)
-		self.launcher_path_entry.set_sensitive(enabled)
-		self.release_channel_combo.set_sensitive(enabled)
-		self.desktop_entry_enabled.set_sensitive(enabled)
-		self.desktop_entry_path_entry.set_sensitive(enabled)
+		for widget in self._editor_widgets:
+			widget.set_sensitive(enabled)
+		# Children of an insensitive row are insensitive too
+		for (box, _) in self._arg_rows:
+			box.set_sensitive(enabled)
+		# The desktop entry options also depend on whether the desktop entry is enabled
 		if enabled:
 			self.update_desktop_entry_controls_state()
 		else:
@@ -593,7 +758,12 @@ class SetupApp:
 		Reload the configuration from the current file.
 		"""
 		try:
-			(self.config, read_error) = get_config(self.config_path)
+			(config, read_error, self._loaded_config_key) = get_config(self.config_path, prev_key = self._loaded_config_key)
+			if config is None:
+				logging.debug("Config file is unchanged, reusing the last one read")
+				config = self._loaded_config
+			# Edits replace self.config rather than modifying it, so the loaded document can be reused as-is
+			self.config = self._loaded_config = config
 			if read_error is not None:
 				if read_error:
 					self.message("Failed to read an existing configuration.\n(Does one already exist?)\nA new config has been generated for you.\nPlease save it before continuing.", title = "Alert", icon_name = WARNING_ICON)
@@ -623,8 +793,13 @@ class SetupApp:
 			if not self.verify_config():
 				raise Exception("Configuration is invalid!")
 			self._flag_modified = False
-			self.config_path.parent.mkdir(parents = True, exist_ok = True)
-			self.config_path.write_text(self.config.as_string())
+			parent = self.config_path.parent
+			if parent not in self._ensured_dirs:
+				parent.mkdir(parents = True, exist_ok = True)
+				self._ensured_dirs.add(parent)
+			self.config_path.write_text(self.config_text())
+			# The save may have created paths that were cached as missing
+			_stat_cache.clear()
 			self._flag_unsaved = False
 			self.config_path_label.set_label("Saved")
 			GLib.timeout_add(MESSAGE_TIMEOUT, self.update_config_path_label)
@@ -674,7 +849,9 @@ def main():
 			Gtk.main()
 
 if __name__ == "__main__":
+	# Only needed for the DBus service process that discord_launcher_lib starts when running Discord
+	import multiprocessing
 	# This should *only* run once.
-	freeze_support()
+	multiprocessing.freeze_support()
 	multiprocessing.set_start_method("spawn")
 	main()
\ No newline at end of file
@@ -1,4 +1,4 @@
-import dasbus, discord_update_lib, logging, os, signal, subprocess, time
+import dasbus, discord_update_lib, logging, os, select, signal, subprocess, typing
 from dasbus.connection import SessionMessageBus
 from dasbus.loop import EventLoop
 from dasbus.server.interface import dbus_interface
@@ -8,6 +8,7 @@ from desktop_entry_lib import DesktopAction, DesktopEntry, TranslatableKey
 from discord_update_lib import ParsingVersionError, BuildInfoNotFoundInTarError, BuildInfoNotFoundError, ReleaseChannelMismatchError, InstalledVersionSameError, InstalledVersionNewerError
 from discord_update_lib import format_version, get_latest_discord_version, Ord, parse_version, remove_directory
 from enum import Enum
+from gi.repository import Gio, GLib
 from multiprocessing import Pipe, Process
 from multiprocessing.connection import Connection
 from pathlib import Path
@@ -16,6 +17,11 @@ ICON_NAME: str = "discord.png"
 NAMESPACE: list[str] = ["xyz", "strangejune", "DiscordLauncher"]
 OBJECT_PATH: str = "/" + "/".join(NAMESPACE)
 SERVICE_NAME: str = ".".join(NAMESPACE)
+DEFAULT_DESKTOP_PATH: str = os.path.expanduser("~/.local/share/applications/{}.desktop".format(SERVICE_NAME))
+# How long to wait for Discord to exit after asking it to stop, in milliseconds
+STOP_TIMEOUT: int = 30000
+# Session bus connection shared by the client functions, created on first use
+_session_bus: SessionMessageBus | None = None
 
 @dbus_interface(".".join(NAMESPACE))
 @dataclass
@@ -47,11 +53,21 @@ class DiscordNotRunningError(Exception):
 	def __init__(self):
 		super().__init__("Discord was not already running")
 
+def normalize_config(config: dict) -> dict:
+	"""
+	Convert the path values in `config` to `Path` objects in place, and return it.
+
+	The functions in this module that take a config expect it to have been through this.
+	"""
+	for key in ("discord_path", "launcher_path"):
+		config[key] = Path(config[key])
+	return config
+
 def get_installed_build_info(config: dict) -> dict:
 	"""
 	Return the build info of the Discord installation.
 	"""
-	return discord_update_lib.get_installed_build_info(Path(config["discord_path"]))
+	return discord_update_lib.get_installed_build_info(config["discord_path"])
 	
 def get_sample_desktop_entry_path(path: Path) -> Path:
 	"""
@@ -72,26 +88,28 @@ def create_desktop_entry(config: dict, force: bool = False):
 	if config["desktop_entry"]["enabled"] or force:
 		logging.info("Reading Discord installation desktop entry")
 		desktop_file_path: Path = Path(config["desktop_entry"]["path"])
-		discord_desktop_file_path: Path = get_sample_desktop_entry_path(Path(config["discord_path"]))
+		discord_desktop_file_path: Path = get_sample_desktop_entry_path(config["discord_path"])
 		discord_desktop_entry: DesktopEntry = DesktopEntry.from_file(discord_desktop_file_path)
 	
 		# Modify the desktop entry
-		discord_desktop_entry.Icon = str(Path(config["discord_path"]).joinpath(ICON_NAME))
-		discord_desktop_entry.Exec = "{} {} update-run".format(Path(config["launcher_path"]).with_name(".venv").joinpath("bin/python"), config["launcher_path"])
-		workingdir: Path | None = Path(config["launcher_path"]).parent
+		discord_desktop_entry.Icon = str(config["discord_path"].joinpath(ICON_NAME))
+		launcher_path: Path = config["launcher_path"]
+		venv_python: Path = launcher_path.with_name(".venv").joinpath("bin/python")
+		discord_desktop_entry.Exec = "{} {} update-run".format(venv_python, launcher_path)
+		workingdir: Path | None = launcher_path.parent
 		if workingdir:
 			discord_desktop_entry.Path = str(workingdir)
 		else:
 			# I'm torn on if this should be considered fatal or not, but I guess if we got this far, go wild.
 			logging.error("Couldn't find the configured launcher_path parent directory! This is very likely to cause problems. Make sure this is set to an ABSOLUTE path!")
 		if config["desktop_entry"]["tryexec"]:
-			discord_desktop_entry.TryExec = config["launcher_path"]
+			discord_desktop_entry.TryExec = str(launcher_path)
 
 		if config["desktop_entry"]["setup_action"]:
 			action = DesktopAction()
 			action.Name = TranslatableKey()
 			action.Name.default_text = "Setup Launcher"
-			action.Exec = "{} {}".format(Path(config["launcher_path"]).with_name(".venv").joinpath("bin/python"), config["launcher_path"])
+			action.Exec = "{} {}".format(venv_python, launcher_path)
 			discord_desktop_entry.Actions["setup"] = action
 
 		logging.info("Writing new discord_launcher desktop entry")
@@ -99,7 +117,7 @@ def create_desktop_entry(config: dict, force: bool = False):
 	else:
 		logging.info("Not creating desktop entry because it is disabled.")
 
-def install_discord_from_tar(config: dict, tar: bytes, force_desktop_entry: bool = False):
+def install_discord_from_tar(config: dict, tar: bytes | typing.BinaryIO, force_desktop_entry: bool = False):
 	"""
 	Install Discord from tar to a directory that is empty or doesn't exist yet.
 	
@@ -107,11 +125,8 @@ def install_discord_from_tar(config: dict, tar: bytes, force_desktop_entry: bool
 
 	If `force_desktop_entry` is true, will create a desktop entry regardless of whether it is enabled in config.
 	"""
-	try:
-		stop_discord()
-	except DiscordNotRunningError:
-		pass
-	discord_update_lib.install_discord(Path(config["discord_path"]), tar, force = True, strict_channel = False)
+	_stop_if_running()
+	discord_update_lib.install_discord(config["discord_path"], tar, force = True, strict_channel = False)
 	create_desktop_entry(config, force = force_desktop_entry)
 
 def uninstall_discord_desktop_file(config: dict):
@@ -135,21 +150,20 @@ def uninstall_discord(config: dict):
 	or `IsADirectoryError` if the configured Discord desktop entry path existed but wasn't a file.
 
 	In the cases where the path didn't exist, this function will attempt to complete the uninstall process before raising the error.
+	If both paths didn't exist, both errors are raised together in an `ExceptionGroup`.
 	"""
-	try:
-		stop_discord()
-	except DiscordNotRunningError:
-		pass
-	discord_path: Path = Path(config["discord_path"])
+	_stop_if_running()
+	discord_path: Path = config["discord_path"]
 	desktop_entry_path: Path = Path(config["desktop_entry"]["path"])
 
 	# Attempt to complete the uninstall process before raising an error.
-	error: Exception | None = None
+	errors: list[Exception] = []
 
 	logging.info("Removing Discord installation at \"{}\"".format(config["discord_path"]))
 	if not discord_path.exists():
 		error = FileNotFoundError("Discord installation did not already exist at \"{}\"".format(discord_path))
 		logging.error(error)
+		errors.append(error)
 	elif not discord_path.is_dir():
 		raise NotADirectoryError("Discord installation specified at \"{}\" is not a directory".format(discord_path))
 	else:
@@ -157,29 +171,33 @@ def uninstall_discord(config: dict):
 
 	logging.info("Removing discord-launcher desktop file at \"\{}\"".format(config["desktop_entry"]["path"]))
 	if not desktop_entry_path.exists():
-		e = FileNotFoundError("Desktop entry did not already exist at \"{}\"".format(desktop_entry_path))
-		logging.error(e)
-		if error is None:
-			error = e
-		else:
-			error.add_note(str(e))
+		error = FileNotFoundError("Desktop entry did not already exist at \"{}\"".format(desktop_entry_path))
+		logging.error(error)
+		errors.append(error)
 	elif not desktop_entry_path.is_file():
 		raise IsADirectoryError("Desktop entry specified at \"{}\" is not a file".format(desktop_entry_path))
 	else:
 		desktop_entry_path.unlink(missing_ok = False)
 
-	if error is not None:
-		raise error
+	if len(errors) == 1:
+		raise errors[0]
+	elif errors:
+		raise ExceptionGroup("Failed to uninstall Discord", errors)
 
-def check_for_updates(config: dict) -> tuple[Ord, tuple[int, int, int], tuple[int, int, int]]:
+def check_for_updates(config: dict, build_info: dict | None = None) -> tuple[Ord, tuple[int, int, int], tuple[int, int, int]]:
 	"""
 	Check if there are updates to Discord.
+
+	`build_info` is the already-read build info of the installation, if the caller has it. Otherwise it is read from the installation.
 	"""
-	build_info: dict = get_installed_build_info(config)
+	if build_info is None:
+		build_info = get_installed_build_info(config)
 	if config["release_channel"] != build_info["releaseChannel"]:
-		raise ReleaseChannelMismatchError((config["release_channel"], build_info["releaseChannel"]))
+		err = ReleaseChannelMismatchError()
+		err.add_note("Config is channel \"{}\" while installed is channel \"{}\"".format(config["release_channel"], build_info["releaseChannel"]))
+		raise err
 
-	return discord_update_lib.check_for_updates(Path(config["discord_path"]))
+	return discord_update_lib.check_for_updates(config["discord_path"], build_info = build_info)
 
 def update_discord(config: dict, strict_channel: bool = True) -> tuple[int, int, int]:
 	"""
@@ -214,11 +232,8 @@ def update_discord(config: dict, strict_channel: bool = True) -> tuple[int, int,
 	if update_info is not None:
 		logging.info("Latest available Discord version is {} of release channel {}.".format(format_version(update_info[2]), build_info["releaseChannel"]))
 
-	try:
-		stop_discord()
-	except DiscordNotRunningError:
-		pass
-	discord_update_lib.download_and_install_discord(Path(config["discord_path"]), channel = config["release_channel"], strict_channel = strict_channel)
+	_stop_if_running()
+	discord_update_lib.download_and_install_discord(config["discord_path"], channel = config["release_channel"], strict_channel = strict_channel)
 	create_desktop_entry(config)
 	return update_info[2]
 
@@ -228,11 +243,8 @@ def install_discord(config: dict):
 	
 	This does *no* version checking and *will* remove any existing installation.
 	"""
-	try:
-		stop_discord()
-	except DiscordNotRunningError:
-		pass
-	discord_update_lib.download_and_install_discord(Path(config["discord_path"]), channel = config["release_channel"], force = True, strict_channel = False)
+	_stop_if_running()
+	discord_update_lib.download_and_install_discord(config["discord_path"], channel = config["release_channel"], force = True, strict_channel = False)
 	create_desktop_entry(config)
 
 def get_discord_binary(config: dict) -> Path:
@@ -246,70 +258,118 @@ def get_discord_binary(config: dict) -> Path:
 		bin_name = "DiscordPTB"
 	elif config["release_channel"] == "canary":
 		bin_name = "DiscordCanary"
-	return Path(config["discord_path"]).joinpath(bin_name)
+	return config["discord_path"].joinpath(bin_name)
+
+def _get_session_bus() -> SessionMessageBus:
+	"""
+	Return the shared session bus connection, connecting the first time.
+	"""
+	global _session_bus
+	if _session_bus is None:
+		_session_bus = SessionMessageBus()
+	return _session_bus
 
 def is_discord_running(bus = None, timeout = 5) -> bool:
 	"""
-	Check if an instance of Discord is runnning by trying to connect to it through DBus.
+	Check if an instance of Discord is runnning by asking DBus whether the launcher's service name is owned.
 
-	`bus` is an optional existing DBus connection to use instead of creating a new one.
+	`bus` is an optional existing DBus connection to use instead of the shared one.
 
 	`timeout` is the maximum time to wait before considering the result to be False. Default is 5ms.
 	"""
-	localbus = False
 	if not bus:
-		bus = SessionMessageBus()
-		localbus = True
-	proxy = bus.get_proxy(SERVICE_NAME, OBJECT_PATH)
+		bus = _get_session_bus()
 
-	output = True
 	try:
-		proxy.Ping(timeout = timeout)
+		return bool(bus.proxy.NameHasOwner(SERVICE_NAME, timeout = timeout))
 	except (TimeoutError, dasbus.error.DBusError):
-		output = False
+		return False
 
-	if localbus:
-		bus.disconnect()
-
-	return output
+def _stop_if_running():
+	"""
+	Stop Discord if it is running, and raise `DiscordRunningError` if it doesn't stop in time.
+	"""
+	try:
+		if not stop_discord():
+			err = DiscordRunningError()
+			err.add_note("Discord did not stop after being asked to")
+			raise err
+	except DiscordNotRunningError:
+		pass
 
-def stop_discord(bus = None, timeout = 5, blocking = True):
+def stop_discord(bus = None, timeout = 5, blocking = True, stop_timeout: int = STOP_TIMEOUT) -> bool:
 	"""
 	Asks the running Discord launcher to stop if an instance is running.
 
-	`bus` is an optional existing DBus connection to use instead of creating a new one.
+	`bus` is an optional existing DBus connection to use instead of the shared one.
 
 	Will raise `DiscordNotRunningError` if Discord was not already running.
 
 	`timeout` is the maximum time in milliseconds to wait before considering Discord to not already be running. Default is 5ms.
 
-	If `blocking` is True, block until Discord is no longer running.
+	If `blocking` is True, block until Discord is no longer running, for at most `stop_timeout` milliseconds.
+
+	Returns False if Discord was still running when `stop_timeout` ran out, otherwise True.
 	"""
-	localbus: bool = False
 	if not bus:
-		bus = SessionMessageBus()
-		localbus = True
+		bus = _get_session_bus()
 	proxy = bus.get_proxy(SERVICE_NAME, OBJECT_PATH)
 
+	if blocking:
+		# Subscribe before anything is sent, so the launcher can't drop its name unnoticed in between
+		loop: EventLoop = EventLoop()
+		def on_name_owner_changed(name: str, old_owner: str, new_owner: str):
+			if name == SERVICE_NAME and not new_owner:
+				loop.quit()
+		bus.proxy.NameOwnerChanged.connect(on_name_owner_changed)
+
 	try:
-		pid: int = int(proxy.PID(timeout = timeout))
-		proxy.Stop(timeout = timeout)
-		logging.debug("Sent Stop to {}".format(SERVICE_NAME))
+		try:
+			pid: int = int(proxy.PID(timeout = timeout))
+		except dasbus.error.DBusError:
+			err = DiscordNotRunningError()
+			err.add_note("Error connecting to {}".format(SERVICE_NAME))
+			raise err
+
+		# Stop has nothing to return, so don't wait for a reply
+		message: Gio.DBusMessage = Gio.DBusMessage.new_method_call(SERVICE_NAME, OBJECT_PATH, SERVICE_NAME, "Stop")
+		message.set_flags(Gio.DBusMessageFlags.NO_REPLY_EXPECTED)
+		bus.connection.send_message(message, Gio.DBusSendMessageFlags.NONE)
+		bus.connection.flush_sync(None)
+		logging.debug("Sent Stop to {} (Discord PID is {})".format(SERVICE_NAME, pid))
+
 		if blocking:
-			while True:
+			stopped: bool = True
+			try:
+				pidfd: int = os.pidfd_open(pid)
+			except OSError:
+				# No pidfd support, or Discord already exited. The launcher releases its name once Discord has exited.
+				timed_out: list[bool] = [False]
+				def on_timeout() -> bool:
+					timed_out[0] = True
+					loop.quit()
+					return GLib.SOURCE_REMOVE
+				timeout_id: int = GLib.timeout_add(stop_timeout, on_timeout)
+				loop.run()
+				if timed_out[0]:
+					stopped = False
+				else:
+					GLib.source_remove(timeout_id)
+			else:
+				# The pidfd becomes readable the moment the process exits
 				try:
-					os.kill(pid, 0)
-					time.sleep(0.05)
-				except:
-					break
+					(readable, _, _) = select.select([pidfd], [], [], stop_timeout / 1000)
+					stopped = bool(readable)
+				finally:
+					os.close(pidfd)
+			if not stopped:
+				logging.error("Discord (PID {}) did not stop within {}ms".format(pid, stop_timeout))
+				return False
 			logging.debug("Discord is no longer running")
-	except dasbus.error.DBusError:
-		err = DiscordNotRunningError()
-		err.add_note("Error connecting to {}".format(SERVICE_NAME))
-		raise err
-
-	if localbus:
-		bus.disconnect()
+		return True
+	finally:
+		if blocking:
+			bus.proxy.NameOwnerChanged.disconnect(on_name_owner_changed)
 
 def run_discord(config: dict, launch_args = []):
 	"""
@@ -328,32 +388,50 @@ def run_discord(config: dict, launch_args = []):
 	build_info = get_installed_build_info(config)
 	version = parse_version(build_info["version"])
 
-	logging.debug("Spawning DBus process and waiting for intial response")
+	logging.debug("Spawning DBus process")
 	(pipe, c2) = Pipe(True)
 	dbus_process: Process = Process(target = _run_dbus_service, args = (c2, config, version, build_info["releaseChannel"]))
 	dbus_process.start()
-	response: None | dasbus.error.DBusError = pipe.recv()
-	if response:
-		logging.critical("Failed to start DBus service!")
-		raise response
-	del response
+	# Only the DBus process should hold its end, so `recv` raises EOFError instead of blocking forever if that process dies
+	c2.close()
 
 	#bus = SessionMessageBus()
 	#bus.register_service(SERVICE_NAME)
 
+	# Start Discord while the DBus process is still starting up, instead of waiting for it first.
+	# If the service fails to start, Discord is stopped again below.
 	logging.debug("Running Discord at '{}' using launch args {}".format(bin, launch_args))
-	discord_process = subprocess.Popen([bin] + launch_args, cwd = config["working_directory"])
-
+	try:
+		discord_process = subprocess.Popen([bin] + launch_args, cwd = config["working_directory"])
+	except BaseException:
+		dbus_process.terminate()
+		raise
 	logging.debug("Discord PID is {}".format(discord_process.pid))
-	pipe.send(discord_process.pid)
-	# The type checker complains about "redefining" `response` here,
-	# but I'm annoyed and I'm not changing it
-	response: None | dasbus.error.DBusError = pipe.recv()
-	if response:
-		logging.critical("Failed to set DBus object!")
+
+	try:
+		logging.debug("Waiting for initial response from DBus process")
+		response: None | dasbus.error.DBusError = pipe.recv()
+		if response:
+			logging.critical("Failed to start DBus service!")
+			raise response
+		del response
+
+		pipe.send(discord_process.pid)
+		# The type checker complains about "redefining" `response` here,
+		# but I'm annoyed and I'm not changing it
+		response: None | dasbus.error.DBusError = pipe.recv()
+		if response:
+			logging.critical("Failed to set DBus object!")
+			raise response
+		del response
+	except BaseException as err:
+		if isinstance(err, EOFError):
+			logging.critical("DBus process exited without responding!")
+		# Don't leave Discord running unmanaged, or as a zombie
 		os.kill(discord_process.pid, signal.SIGTERM)
-		raise response
-	del response
+		discord_process.wait()
+		dbus_process.terminate()
+		raise
 	#bus.publish_object(OBJECT_PATH, DiscordLauncher(config, version, discord_process.pid))
 	#dbus_process = Process(target = _run_dbus_service2, args = (bus, EventLoop()))
 	#dbus_process.start()
@@ -1,14 +1,45 @@
-import collections, io, json, logging, re as regex, requests, tarfile
+import collections, concurrent.futures, functools, io, json, logging, os, queue, re as regex, requests, shutil, tarfile, threading, typing
 from pathlib import Path
 from enum import Enum
 
+# isal's gzip decompression is several times faster than the stdlib's, but it's optional.
+try:
+	from isal import igzip as gzip
+except ImportError:
+	import gzip
+# rapidgzip decompresses in parallel, but needs to seek, so it's only used for seekable input.
+try:
+	import rapidgzip
+except ImportError:
+	rapidgzip = None
+
 DOWNLOAD_URL: str = "https://discord.com/api/download"
 DOWNLOAD_PARAMS: str = "platform=linux&format=tar.gz"
 BUILD_INFO_PATH: str = "resources/build_info.json"
+# Matches paths inside the folder Discord is packed in inside the tar, which depends on release channel, and captures the path relative to it
+_ROOT_REGEX_RAW: str = r"Discord(?:PTB|Canary)?/(.+)"
+ROOT_REGEX: regex.Pattern = regex.compile(_ROOT_REGEX_RAW, regex.ASCII | regex.DOTALL)
 _URL_VERSION_REGEX_RAW: str = r"\/(\d+)\.(\d+)\.(\d+)\/"
-URL_VERSION_REGEX: regex.Pattern = regex.compile(_URL_VERSION_REGEX_RAW)
+URL_VERSION_REGEX: regex.Pattern = regex.compile(_URL_VERSION_REGEX_RAW, regex.ASCII)
 _VERSION_REGEX_RAW: str = r"(\d+)\.(\d+)\.(\d+)"
-VERSION_REGEX: regex.Pattern = regex.compile(_VERSION_REGEX_RAW)
+VERSION_REGEX: regex.Pattern = regex.compile(_VERSION_REGEX_RAW, regex.ASCII)
+# Size of each range requested when downloading with several connections
+DOWNLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+DOWNLOAD_WORKERS: int = 4
+# Size of each read, and how many reads may be buffered, when reading a single connection ahead
+READ_AHEAD_CHUNK_SIZE: int = 1024 * 1024
+READ_AHEAD_DEPTH: int = 16
+# Threads writing extracted files, the largest file handed to them, and how many files may wait for them
+EXTRACT_WORKERS: int = 8
+PARALLEL_WRITE_MAX_SIZE: int = 1024 * 1024
+EXTRACT_QUEUE_SIZE: int = 64
+
+# Shared by every request, so connections to discord.com and the CDN are kept alive and reused.
+# The pool is big enough for every download worker to hold its own connection.
+_session: requests.Session = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections = 4, pool_maxsize = max(8, DOWNLOAD_WORKERS)))
+# Last download location for each API URL, along with its ETag
+_location_cache: dict[str, tuple[str, str]] = {}
 
 class ParsingVersionError(Exception):
 	def __init__(self):
@@ -34,20 +65,44 @@ class InstalledVersionNewerError(Exception):
 	def __init__(self):
 		super().__init__("Attempted to install Discord version which is older than the one installed")
 
-def get_download_location(channel: str = "") -> str:
+def get_api_url(channel: str = "") -> str:
 	"""
-	Return the download location of the Discord tar.gz file.
+	Return the Discord API URL that redirects to the Discord tar.gz file.
 
 	The release channel can be specified. Default is stable, but ptb and canary are also valid options.
 	"""
-	url: str = ""
 	if channel and channel != "stable":
-		url = "{}/{}?{}".format(DOWNLOAD_URL, channel, DOWNLOAD_PARAMS)
+		return "{}/{}?{}".format(DOWNLOAD_URL, channel, DOWNLOAD_PARAMS)
 	else:
-		url = "{}?{}".format(DOWNLOAD_URL, DOWNLOAD_PARAMS)
+		return "{}?{}".format(DOWNLOAD_URL, DOWNLOAD_PARAMS)
+
+def get_download_location(channel: str = "") -> str:
+	"""
+	Return the download location of the Discord tar.gz file.
+
+	The release channel can be specified. Default is stable, but ptb and canary are also valid options.
+	"""
+	url: str = get_api_url(channel = channel)
 	logging.debug("Using Discord API URL \"{}\"".format(url))
-	response: requests.models.Response = requests.get(url, allow_redirects=False)
-	return response.headers["Location"]
+	headers: dict[str, str] = {}
+	cached: tuple[str, str] | None = _location_cache.get(url)
+	if cached is not None:
+		headers["If-None-Match"] = cached[0]
+	# Only the Location header is needed, so don't ask for a body
+	response: requests.models.Response = _session.head(url, allow_redirects = False, headers = headers)
+	if response.status_code == 304 and cached is not None:
+		logging.debug("Discord download location is unchanged")
+		return cached[1]
+	if not response.is_redirect:
+		logging.debug("HEAD was not redirected (status {}), retrying with GET".format(response.status_code))
+		response = _session.get(url, allow_redirects = False, headers = headers)
+		if response.status_code == 304 and cached is not None:
+			return cached[1]
+	location: str = response.headers["Location"]
+	etag: str | None = response.headers.get("ETag")
+	if etag is not None:
+		_location_cache[url] = (etag, location)
+	return location
 
 # Why doesn't Python have enums built-in? Argh...
 class Ord(Enum):
@@ -70,6 +125,7 @@ def get_latest_discord_version(channel: str = "") -> tuple[int, int, int]:
 	else:
 		return (int(regex_search.group(1)), int(regex_search.group(2)), int(regex_search.group(3)))
 
+@functools.lru_cache(maxsize = 64)
 def parse_version(version: str) -> tuple[int, int, int]:
 	"""
 	Return a (int, int, int) from a version string.
@@ -83,23 +139,13 @@ def parse_version(version: str) -> tuple[int, int, int]:
 		return (int(regex_match.group(1)), int(regex_match.group(2)), int(regex_match.group(3)))
 
 def compare_versions(v1: tuple[int, int, int], v2: tuple[int, int, int]) -> Ord:
-	if v1[0] > v2[0]:
+	if v1 == v2:
+		return Ord.EQUAL_TO
+	# Tuples compare element by element, so this orders by major, then minor, then patch.
+	elif v1 > v2:
 		return Ord.GREATER_THAN
-	elif v1[0] < v2[0]:
-		return Ord.LESS_THAN
-		
 	else:
-		if v1[1] > v2[1]:
-			return Ord.GREATER_THAN
-		elif v1[1] < v2[1]:
-			return Ord.LESS_THAN
-		else:
-			if v1[2] > v2[2]:
-				return Ord.GREATER_THAN
-			elif v1[2] < v2[2]:
-				return Ord.LESS_THAN
-			else:
-				return Ord.EQUAL_TO
+		return Ord.LESS_THAN
 
 def format_version(version: collections.abc.Collection[int]) -> str:
 	"""
@@ -107,15 +153,178 @@ def format_version(version: collections.abc.Collection[int]) -> str:
 	"""
 	return ".".join(str(number) for number in version)
 
-def download_discord(channel: str = "") -> bytes:
+class _RangeDownload(io.RawIOBase):
+	"""
+	A readable stream of the file at a URL, fetched in ordered chunks by several threads at once using HTTP range requests.
 	"""
-	Download the Discord tar, and return it in bytes.
+	def __init__(self, url: str, length: int, workers: int):
+		self._url: str = url
+		self._length: int = length
+		self._executor = concurrent.futures.ThreadPoolExecutor(max_workers = workers)
+		self._pending: collections.deque[concurrent.futures.Future] = collections.deque()
+		self._next_offset: int = 0
+		self._buffer: memoryview = memoryview(b"")
+		# Responses still being read by the workers, so closing can cut them off
+		self._responses: set[requests.models.Response] = set()
+		self._responses_lock: threading.Lock = threading.Lock()
+		self._closing: threading.Event = threading.Event()
+		# Keep two chunks queued per worker, so none of them wait on the reader while it consumes one.
+		for _ in range(workers * 2):
+			self._submit_next()
+
+	def _fetch(self, start: int, end: int) -> bytes:
+		response: requests.models.Response = _session.get(self._url, headers = {"Range": "bytes={}-{}".format(start, end), "Accept-Encoding": "identity"}, stream = True)
+		with self._responses_lock:
+			self._responses.add(response)
+		try:
+			# Checked after registering, so a close that missed this response is still noticed
+			if self._closing.is_set():
+				raise ValueError("Download was closed")
+			response.raise_for_status()
+			if response.status_code != 206:
+				raise requests.HTTPError("Server ignored range request (status {})".format(response.status_code), response = response)
+			return response.content
+		finally:
+			with self._responses_lock:
+				self._responses.discard(response)
+			response.close()
+
+	def _submit_next(self):
+		if self._next_offset < self._length:
+			end: int = min(self._next_offset + DOWNLOAD_CHUNK_SIZE, self._length) - 1
+			self._pending.append(self._executor.submit(self._fetch, self._next_offset, end))
+			self._next_offset = end + 1
+
+	def readable(self) -> bool:
+		return True
+
+	def readinto(self, buffer) -> int:
+		if not self._buffer:
+			if not self._pending:
+				return 0
+			self._buffer = memoryview(self._pending.popleft().result())
+			self._submit_next()
+		size: int = min(len(buffer), len(self._buffer))
+		buffer[:size] = self._buffer[:size]
+		self._buffer = self._buffer[size:]
+		return size
+
+	def close(self):
+		if not self.closed:
+			self._closing.set()
+			for future in self._pending:
+				future.cancel()
+			# Cut off the fetches already running, so shutting down doesn't wait for them to finish downloading
+			with self._responses_lock:
+				responses: list[requests.models.Response] = list(self._responses)
+			for response in responses:
+				response.close()
+			self._executor.shutdown(wait = True)
+			self._pending.clear()
+			self._buffer = memoryview(b"")
+		super().close()
+
+class _ReadAhead(io.RawIOBase):
+	"""
+	A readable stream that reads another stream ahead in a background thread, so the consumer never waits on the source unless it gets ahead of it.
+
+	The source is closed by the background thread once it stops reading.
+	"""
+	def __init__(self, source: typing.BinaryIO):
+		self._source: typing.BinaryIO = source
+		self._chunks: queue.Queue[bytes | Exception] = queue.Queue(maxsize = READ_AHEAD_DEPTH)
+		self._buffer: memoryview = memoryview(b"")
+		self._eof: bool = False
+		# Raised again by every read once the source has failed, since nothing more will arrive in the queue
+		self._error: Exception | None = None
+		self._stopped: threading.Event = threading.Event()
+		threading.Thread(target = self._read_source, daemon = True).start()
+
+	def _read_source(self):
+		try:
+			while not self._stopped.is_set():
+				chunk: bytes = self._source.read(READ_AHEAD_CHUNK_SIZE)
+				self._chunks.put(chunk)
+				if not chunk:
+					break
+		except Exception as err:
+			self._chunks.put(err)
+		finally:
+			self._source.close()
+
+	def readable(self) -> bool:
+		return True
+
+	def readinto(self, buffer) -> int:
+		if not self._buffer:
+			if self._error is not None:
+				raise self._error
+			if self._eof:
+				return 0
+			chunk: bytes | Exception = self._chunks.get()
+			if isinstance(chunk, Exception):
+				self._error = chunk
+				raise chunk
+			elif not chunk:
+				self._eof = True
+				return 0
+			self._buffer = memoryview(chunk)
+		size: int = min(len(buffer), len(self._buffer))
+		buffer[:size] = self._buffer[:size]
+		self._buffer = self._buffer[size:]
+		return size
+
+	def close(self):
+		if not self.closed:
+			self._stopped.set()
+			# Make room in the queue, so the background thread can't stay blocked on it
+			while True:
+				try:
+					self._chunks.get_nowait()
+				except queue.Empty:
+					break
+			self._buffer = memoryview(b"")
+		super().close()
+
+def parallel_download(url: str, workers: int = DOWNLOAD_WORKERS) -> typing.BinaryIO:
+	"""
+	Start downloading the file at url over several connections at once, and return a stream of its bytes in order. Redirects are followed.
+
+	Falls back to a single connection if the server doesn't support range requests. The caller is responsible for closing the stream.
+	"""
+	head: requests.models.Response = _session.head(url, allow_redirects = True, headers = {"Accept-Encoding": "identity"})
+	logging.info("Downloading " + head.url)
+	length: str | None = head.headers.get("Content-Length")
+	if workers > 1 and head.ok and head.headers.get("Accept-Ranges") == "bytes" and length is not None:
+		logging.debug("Downloading {} bytes with {} connections".format(length, workers))
+		return io.BufferedReader(_RangeDownload(head.url, int(length), workers))
+
+	logging.debug("Server does not support range requests, downloading with one connection")
+	response: requests.models.Response = _session.get(url, stream = True)
+	response.raise_for_status()
+	# Only undoes any Content-Encoding of the transfer; the file itself is left as-is
+	response.raw.decode_content = True
+	# The range download already fetches ahead in its workers; this gives the single connection the same overlap with the consumer
+	return io.BufferedReader(_ReadAhead(response.raw))
+
+def download_discord(channel: str = "") -> typing.BinaryIO:
+	"""
+	Start downloading the Discord tar, and return a stream of its bytes as they arrive.
+
+	The caller is responsible for closing the stream.
 
 	The release channel can be specified. Default is stable, but ptb and canary are also valid options.
 	"""
-	download_location: str = get_download_location(channel = channel)
-	logging.info("Downloading Discord from " + download_location)
-	return requests.get(download_location).content
+	# Let the download follow the API redirect itself, rather than looking the location up in a separate request first
+	return parallel_download(get_api_url(channel = channel))
+
+def open_gzip(fileobj: typing.BinaryIO) -> typing.BinaryIO:
+	"""
+	Return a stream of the decompressed contents of the gzip stream `fileobj`, using the fastest decoder available for it.
+	"""
+	if rapidgzip is not None and fileobj.seekable():
+		return rapidgzip.open(fileobj, parallelization = os.cpu_count())
+	return gzip.GzipFile(fileobj = fileobj, mode = "rb")
 
 def get_installed_build_info(path: Path) -> dict:
 	installed_build_info_path: Path = path.joinpath(BUILD_INFO_PATH)
@@ -127,43 +336,21 @@ def get_installed_build_info(path: Path) -> dict:
 		raise IsADirectoryError(installed_build_info_path)
 	return json.loads(installed_build_info_path.read_bytes())
 
-def install_discord(path: Path, tar: bytes, force: bool = False, strict_channel: bool = True):
+def _check_build_info(path: Path, build_info_json: dict | None, force: bool, strict_channel: bool):
 	"""
-	Install Discord from the given tar bytes to the given path.
+	Check the build info from a Discord tar against the existing installation at path, and raise an error if it shouldn't be installed.
 
-	Set `force` to True to skip checking if the given build is newer than an installed version. If checking fails and `force` is False, does not install.
-
-	`strict_channel` determines whether installing Discord from a different channel than the existing install will be forbidden. If checking fails and `strict_channel` is True, does not install.
+	`build_info_json` is None if the tar had no build_info.json.
 	"""
-	tar_io: io.BytesIO = io.BytesIO(tar)
-	logging.info("Opening tar file")
-	tar_object: tarfile.TarFile = tarfile.open(fileobj = tar_io)
-
-	# Get the Discord folder inside the tar.
-	root_names: list[str] = ["Discord/", "DiscordPTB/", "DiscordCanary/"]
-	root_members: list[tarfile.TarInfo] = []
-	build_info: tarfile.TarInfo | None = None
-	for item in tar_object.getmembers():
-		for root_name in root_names:
-			if item.path == "{}{}".format(root_name, BUILD_INFO_PATH):
-				build_info = item
-			if item.path.startswith(root_name):
-				item.name = item.name.removeprefix(root_name)
-				root_members.append(item)
-
-	# Check build_info.json from the tar
-	build_info_json: dict = {}
-	if build_info:
-		file = tar_object.extractfile(build_info)
-		assert file is not None
-		build_info_json = json.loads(file.read())
-		logging.info("Discord version in archive is {} of release channel {}".format(build_info_json["version"], build_info_json["releaseChannel"]))
-	else:
+	if build_info_json is None:
 		if strict_channel or not force:
 			err = BuildInfoNotFoundInTarError()
 			err.add_note("Expected path in tar: " + BUILD_INFO_PATH)
+			raise err
 		else:
 			logging.warning("Could not find Discord build_info.json in tar at path \"{}\"!".format(BUILD_INFO_PATH))
+			return
+	logging.info("Discord version in archive is {} of release channel {}".format(build_info_json["version"], build_info_json["releaseChannel"]))
 
 	# Check build_info.json from the existing install.
 	try:
@@ -201,7 +388,96 @@ def install_discord(path: Path, tar: bytes, force: bool = False, strict_channel:
 			raise err
 		else:
 			logging.warning("Could not find build_info.json of existing installation at path \"{}\"!".format(path.joinpath(BUILD_INFO_PATH)))
-			
+
+def _write_file(target: Path, data: bytes, member: tarfile.TarInfo):
+	"""
+	Write a regular file extracted from a tar, and apply its mode and modification time.
+	"""
+	target.write_bytes(data)
+	_set_attributes(target, member)
+
+def _set_attributes(target: Path, member: tarfile.TarInfo):
+	"""
+	Apply the mode and modification time of a tar member to its extracted path.
+	"""
+	if member.mode is not None:
+		os.chmod(target, member.mode)
+	if member.mtime is not None:
+		os.utime(target, (member.mtime, member.mtime))
+
+def install_discord(path: Path, tar: bytes | typing.BinaryIO, force: bool = False, strict_channel: bool = True):
+	"""
+	Install Discord from the given tar.gz bytes or stream to the given path.
+
+	The tar is read in a single pass, so a download stream is extracted while it arrives. It is extracted next to path first, and only replaces the existing installation once it has been checked.
+
+	Set `force` to True to skip checking if the given build is newer than an installed version. If checking fails and `force` is False, does not install.
+
+	`strict_channel` determines whether installing Discord from a different channel than the existing install will be forbidden. If checking fails and `strict_channel` is True, does not install.
+	"""
+	if isinstance(tar, bytes):
+		tar = io.BytesIO(tar)
+	staging: Path = path.with_name(".{}.partial".format(path.name))
+	if staging.exists():
+		logging.info("Removing leftover partial Discord installation at \"{}\"".format(staging))
+		remove_directory(staging)
+	staging.mkdir(parents = False)
+
+	try:
+		logging.info("Extracting tar file to \"{}\"".format(staging))
+		found_build_info: bool = False
+		# Streaming mode; members can only be visited once, in order. Decompression is done here rather than by tarfile so a faster decoder can be used.
+		with open_gzip(tar) as decompressed, tarfile.open(fileobj = decompressed, mode = "r|") as tar_object, concurrent.futures.ThreadPoolExecutor(max_workers = EXTRACT_WORKERS) as writers:
+			pending: collections.deque[concurrent.futures.Future] = collections.deque()
+			directories: list[tarfile.TarInfo] = []
+			for member in tar_object:
+				# Only extract the Discord folder inside the tar, without the folder itself.
+				root_match: regex.Match[str] | None = ROOT_REGEX.match(member.name)
+				if root_match is None:
+					continue
+				member.name = root_match.group(1)
+				if member.islnk():
+					# Hard links name their target by its path in the tar, so it needs the same root removed
+					link_match: regex.Match[str] | None = ROOT_REGEX.match(member.linkname)
+					if link_match is not None:
+						member.linkname = link_match.group(1)
+
+				if member.isfile() and (member.size <= PARALLEL_WRITE_MAX_SIZE or member.name == BUILD_INFO_PATH):
+					# Small files are written by the thread pool, so their syscalls overlap with decoding the rest of the tar
+					filtered: tarfile.TarInfo = tarfile.data_filter(member, str(staging))
+					data: bytes = tar_object.extractfile(member).read()
+					if member.name == BUILD_INFO_PATH:
+						# Check build_info.json from the tar as soon as it arrives, so a rejected build stops the download early
+						found_build_info = True
+						_check_build_info(path, json.loads(data), force, strict_channel)
+					target: Path = staging.joinpath(filtered.name)
+					target.parent.mkdir(parents = True, exist_ok = True)
+					if len(pending) >= EXTRACT_QUEUE_SIZE:
+						pending.popleft().result()
+					pending.append(writers.submit(_write_file, target, data, filtered))
+				else:
+					if not member.isfile() and not member.isdir():
+						# Links may point at files that are still being written
+						while pending:
+							pending.popleft().result()
+					if member.isdir():
+						# Directory attributes are applied at the end, so files can still be written into them until then.
+						# The data filter drops directory modes entirely, so keep the mode, minus the bits it would strip from a file.
+						directories.append(tarfile.data_filter(member, str(staging)).replace(mode = member.mode & 0o755, deep = False))
+					tar_object.extract(member, path = staging, set_attrs = not member.isdir(), filter = "data")
+
+			while pending:
+				pending.popleft().result()
+
+		if not found_build_info:
+			_check_build_info(path, None, force, strict_channel)
+
+		# Like extractall, deepest first, now that every file has been written
+		for directory in sorted(directories, key = lambda directory: directory.name, reverse = True):
+			_set_attributes(staging.joinpath(directory.name), directory)
+	except BaseException:
+		remove_directory(staging)
+		raise
 
 	# If we got this far:
 	#   the requested version should be NEWER than the installed version or from a different channel,
@@ -211,18 +487,16 @@ def install_discord(path: Path, tar: bytes, force: bool = False, strict_channel:
 	if path.exists():
 		logging.info("Removing old Discord installation at \"{}\"".format(path))
 		remove_directory(path)
-	path.mkdir(parents=False)
-
-	logging.info("Extracting tar file to \"{}\"".format(path))
-	tar_object.extractall(path = path, members = root_members, filter = "data")
-	tar_object.close()
+	staging.rename(path)
 
-def check_for_updates(path: Path) -> tuple[Ord, tuple[int, int, int], tuple[int, int, int]]:
+def check_for_updates(path: Path, build_info: dict | None = None) -> tuple[Ord, tuple[int, int, int], tuple[int, int, int]]:
 	"""
 	Check if there are updates available to the given Discord installation at path.
+
+	`build_info` is the already-read build_info.json of the installation, if the caller has it. Otherwise it is read from path.
 	"""
 	# Check build_info.json from the existing install.
-	installed_build_info_json: dict = get_installed_build_info(path)
+	installed_build_info_json: dict = build_info if build_info is not None else get_installed_build_info(path)
 	channel: str = "stable"
 	if installed_build_info_json["releaseChannel"] == "canary" or installed_build_info_json["releaseChannel"] == "ptb":
 		channel = installed_build_info_json["releaseChannel"]
@@ -242,18 +516,12 @@ def download_and_install_discord(path, channel: str = "", force: bool = False, s
 
 	`strict_channel` determines whether installing Discord from a different channel than the existing install will be forbidden. If checking fails and `strict_channel` is True, does not install.
 	"""
-	install_discord(path, download_discord(channel = channel), force, strict_channel)
+	with download_discord(channel = channel) as tar:
+		install_discord(path, tar, force, strict_channel)
 
 def remove_directory(path):
 	"""
 	Remove a directory and its contents. Silently skips anything that isn't a directory.
-
-	This might be in pathlib, but I didn't see it.
 	"""
 	if path.is_dir():
-		for item in path.iterdir():
-			if item.is_dir():
-				remove_directory(item)
-			else:
-				item.unlink()
-		path.rmdir()
\ No newline at end of file
+		shutil.rmtree(path)
\ No newline at end of file
@@ -0,0 +1,63 @@
+import io, json, tarfile, tempfile, unittest
+from pathlib import Path
+
+import discord_update_lib
+
+def _make_tar(members: list[tuple[tarfile.TarInfo, bytes | None]]) -> bytes:
+	"""
+	Return a tar.gz containing `members`, given as (info, file contents) pairs.
+	"""
+	buffer = io.BytesIO()
+	with tarfile.open(fileobj = buffer, mode = "w:gz") as tar_object:
+		for (info, data) in members:
+			if data is not None:
+				info.size = len(data)
+				tar_object.addfile(info, io.BytesIO(data))
+			else:
+				tar_object.addfile(info)
+	return buffer.getvalue()
+
+def _file(name: str, data: bytes) -> tuple[tarfile.TarInfo, bytes]:
+	info = tarfile.TarInfo(name)
+	info.mode = 0o755
+	return (info, data)
+
+def _directory(name: str) -> tuple[tarfile.TarInfo, None]:
+	info = tarfile.TarInfo(name)
+	info.type = tarfile.DIRTYPE
+	info.mode = 0o755
+	return (info, None)
+
+def _hardlink(name: str, target: str) -> tuple[tarfile.TarInfo, None]:
+	info = tarfile.TarInfo(name)
+	info.type = tarfile.LNKTYPE
+	info.linkname = target
+	return (info, None)
+
+class InstallDiscordTest(unittest.TestCase):
+	def setUp(self):
+		self._temp_dir = tempfile.TemporaryDirectory()
+		self.path = Path(self._temp_dir.name).joinpath("Discord")
+
+	def tearDown(self):
+		self._temp_dir.cleanup()
+
+	def test_hardlink_is_extracted_relative_to_root(self):
+		build_info = json.dumps({"version": "0.0.1", "releaseChannel": "stable"}).encode()
+		tar = _make_tar([
+			_directory("Discord"),
+			_directory("Discord/resources"),
+			_file("Discord/resources/build_info.json", build_info),
+			_file("Discord/Discord", b"binary"),
+			_hardlink("Discord/DiscordLink", "Discord/Discord"),
+		])
+
+		discord_update_lib.install_discord(self.path, tar, force = True, strict_channel = False)
+
+		link = self.path.joinpath("DiscordLink")
+		self.assertEqual(link.read_bytes(), b"binary")
+		self.assertEqual(link.stat().st_ino, self.path.joinpath("Discord").stat().st_ino)
+		self.assertFalse(self.path.with_name(".Discord.partial").exists())
+
+if __name__ == "__main__":
+	unittest.main()